@@ -0,0 +1,178 @@
+"""
+Cold-start benchmark for the API.
+
+Each run starts a fresh interpreter, imports main, runs the lifespan startup
+and serves a first request to /api/archives over raw ASGI. That request builds
+the Chess.com service and its HTTP client (importing httpx) through
+get_chess_service; only the download itself is stubbed, so no network or
+server cost is measured. Exits non-zero when the median of any measurement
+exceeds its budget, or when a deferred heavy module was imported eagerly.
+tests/test_cold_start.py always checks the imports and the response status,
+and enforces the same budgets when COLD_START_BUDGETS=1 is set.
+
+Usage:
+    python cold_start_benchmark.py [--runs 5] [--import-budget 0.8] [--first-request-budget 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import List, Optional
+
+# Modules that must only be imported once the service that needs them is used
+DEFERRED_MODULES = ["openai", "httpx"]
+
+# Median seconds allowed to import main, and from interpreter start to first response
+IMPORT_BUDGET = float(os.getenv("COLD_START_IMPORT_BUDGET", "0.8"))
+FIRST_REQUEST_BUDGET = float(os.getenv("COLD_START_FIRST_REQUEST_BUDGET", "1.0"))
+
+# Runs in a fresh interpreter and prints its measurements as JSON
+_PROBE = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+eager = [m for m in %(deferred)r if m in sys.modules]
+
+
+async def download(self, url):
+    # Build the real HTTP client as a real request would, but skip the network
+    self.client
+    return b'{"archives": []}'
+
+
+main.ChessComAPIService._download = download
+
+
+async def first_request():
+    lifespan_messages = [{"type": "lifespan.startup"}]
+
+    async def lifespan_receive():
+        if lifespan_messages:
+            return lifespan_messages.pop(0)
+        await asyncio.Event().wait()
+
+    started = asyncio.Event()
+
+    async def lifespan_send(message):
+        if message["type"] == "lifespan.startup.complete":
+            started.set()
+
+    lifespan = asyncio.ensure_future(
+        main.app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, lifespan_receive, lifespan_send)
+    )
+    await started.wait()
+    startup_done = time.perf_counter()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/archives/benchmark", "raw_path": b"/api/archives/benchmark",
+        "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost")], "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    await main.app(scope, receive, send)
+    lifespan.cancel()
+    return startup_done, status[0]
+
+
+startup_done, status = asyncio.run(first_request())
+done = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "startup": startup_done - imported,
+    "first_request": done - start,
+    "status": status,
+    "eager_imports": eager,
+}))
+"""
+
+
+def run_once() -> dict:
+    """Measure one cold start in a fresh interpreter"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE % {"deferred": DEFERRED_MODULES}],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check(
+    runs: list,
+    import_budget: Optional[float] = None,
+    first_request_budget: Optional[float] = None
+) -> List[str]:
+    """
+    Compare cold-start measurements against their budgets.
+
+    Args:
+        runs: Results of run_once()
+        import_budget: Max median seconds to import main (None to skip)
+        first_request_budget: Max median seconds from interpreter start to
+            first response (None to skip)
+
+    Returns:
+        List of failure messages, empty if everything is within budget
+    """
+    failures = []
+    if import_budget is not None and statistics.median(r["import"] for r in runs) > import_budget:
+        failures.append("import time over budget")
+    if (
+        first_request_budget is not None
+        and statistics.median(r["first_request"] for r in runs) > first_request_budget
+    ):
+        failures.append("time to first request over budget")
+    if any(r["status"] != 200 for r in runs):
+        failures.append("first request did not return 200")
+    eager = sorted({m for r in runs for m in r["eager_imports"]})
+    if eager:
+        failures.append(f"deferred modules imported at startup: {', '.join(eager)}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure API cold-start time against a budget")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure")
+    parser.add_argument(
+        "--import-budget", type=float, default=IMPORT_BUDGET, help="Max median seconds to import main"
+    )
+    parser.add_argument(
+        "--first-request-budget",
+        type=float,
+        default=FIRST_REQUEST_BUDGET,
+        help="Max median seconds from interpreter start to first response",
+    )
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    import_time = statistics.median(r["import"] for r in runs)
+    startup_time = statistics.median(r["startup"] for r in runs)
+    first_request_time = statistics.median(r["first_request"] for r in runs)
+
+    print(f"import main:       {import_time * 1000:7.1f} ms (budget {args.import_budget * 1000:.0f} ms)")
+    print(f"lifespan startup:  {startup_time * 1000:7.1f} ms")
+    print(f"first request:     {first_request_time * 1000:7.1f} ms (budget {args.first_request_budget * 1000:.0f} ms)")
+
+    failures = check(runs, args.import_budget, args.first_request_budget)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
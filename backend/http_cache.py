@@ -0,0 +1,50 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+# Settled months can no longer change, so browsers and CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Data that still changes (recent months, archive list) is briefly reusable and
+# served stale while the cache revalidates in the background
+SHORT_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+
+def make_etag(body: bytes) -> str:
+    """Build a strong ETag from the response body's content hash"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, per RFC 9110)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cached_json_response(request: Request, body: bytes, cache_control: str) -> Response:
+    """
+    Build a JSON response with ETag and Cache-Control headers.
+
+    Answers with 304 Not Modified when the request's If-None-Match matches.
+
+    Args:
+        request: Incoming request
+        body: Serialized JSON body
+        cache_control: Cache-Control header value
+
+    Returns:
+        Response with the body, or an empty 304 response
+    """
+    etag = make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(etag, request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
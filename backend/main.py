@@ -1,10 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from services.chess_api import ChessComAPIService
+from services.cache import CacheBackend, create_cache_backend
+from services.chess_api import ChessComAPIService, is_settled_archive
 from services.openai_service import OpenAIAnalysisService
-from models import GameHistoryResponse, UserRequest
+from services.game_index import GameIndex, decode_rows, encode_rows
+from services.ingest import IngestPool, MonthBatch
+from models import ChessGame, GameHistoryResponse, HeadToHeadResponse, UserRequest
+from http_cache import IMMUTABLE_CACHE_CONTROL, SHORT_CACHE_CONTROL, cached_json_response
+from months import is_settled_month
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import hashlib
+import json
 import logging
 import os
 from dotenv import load_dotenv
@@ -15,7 +23,39 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Chess.com Game Analyzer API")
+# Marks a service that hasn't been constructed yet (None means construction failed)
+_NOT_CREATED = object()
+
+# Analyses of the same games are reused for a week
+ANALYSIS_TTL = 7 * 24 * 3600
+# Two OpenAI round trips can be slow; don't let another worker take over too early
+ANALYSIS_LOCK_TTL = 300
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Services are created lazily on first use and closed on shutdown"""
+    # Shared between workers unless CACHE_URL selects the in-process backend
+    app.state.cache = create_cache_backend()
+    app.state.chess_service = _NOT_CREATED
+    app.state.openai_service = _NOT_CREATED
+    # Worker processes are only started once a large archive needs parsing
+    app.state.ingest_pool = IngestPool()
+    # Per-worker index; rows are also published to the shared cache so every
+    # worker (and a restarted one) can catch up, see sync_game_index()
+    app.state.game_index = GameIndex()
+    yield
+
+    app.state.ingest_pool.close()
+
+    if isinstance(app.state.chess_service, ChessComAPIService):
+        await app.state.chess_service.close()
+    if isinstance(app.state.openai_service, OpenAIAnalysisService):
+        app.state.openai_service.close()
+    await app.state.cache.close()
+
+
+app = FastAPI(title="Chess.com Game Analyzer API", lifespan=lifespan)
 
 # CORS middleware for frontend communication
 app.add_middleware(
@@ -26,15 +66,123 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-chess_service = ChessComAPIService()
+async def get_chess_service(request: Request) -> ChessComAPIService:
+    """Get the Chess.com service, creating it on first use"""
+    state = request.app.state
+    if state.chess_service is _NOT_CREATED:
+        state.chess_service = ChessComAPIService(cache=state.cache)
+    return state.chess_service
+
+
+async def get_openai_service(request: Request) -> Optional[OpenAIAnalysisService]:
+    """Get the OpenAI service, creating it on first use (None if API key not set)"""
+    state = request.app.state
+    if state.openai_service is _NOT_CREATED:
+        try:
+            state.openai_service = OpenAIAnalysisService()
+            logger.info("OpenAI service initialized successfully")
+        except Exception as e:
+            state.openai_service = None
+            logger.warning(f"OpenAI service not available: {e}")
+    return state.openai_service
+
+
+async def get_ingest_pool(request: Request) -> IngestPool:
+    """Get the process pool for CPU-bound ingestion"""
+    return request.app.state.ingest_pool
+
+
+async def get_cache(request: Request) -> CacheBackend:
+    """Get the cache backend"""
+    return request.app.state.cache
+
+
+async def get_game_index(request: Request) -> GameIndex:
+    """Get this worker's opponent/opening index"""
+    return request.app.state.game_index
+
 
-# Initialize OpenAI service (will be None if API key not set)
-try:
-    openai_service = OpenAIAnalysisService()
-    logger.info("OpenAI service initialized successfully")
-except Exception as e:
-    openai_service = None
-    logger.warning(f"OpenAI service not available: {e}")
+def game_cache_key(game_url: str) -> str:
+    """Build the cache key under which a full game is shared"""
+    return f"game:{game_url}"
+
+
+def index_cache_key(username: str, archive_url: str) -> str:
+    """Build the cache key under which a month's index rows are shared"""
+    return f"index:{username.lower()}:{archive_url.lower()}"
+
+
+def index_archives_key(username: str) -> str:
+    """Build the cache key listing the archives a player has index rows for"""
+    return f"index:{username.lower()}"
+
+
+async def publish_month(username: str, archive_url: str, batch: MonthBatch, cache: CacheBackend):
+    """
+    Share an ingested month's games and index rows with other workers.
+
+    Stored without expiry, unlike the raw archive, so head-to-head queries
+    keep every fetched month after its archive expires. Size-bounded backends
+    still evict them like any other entry.
+    """
+    await cache.set_many({game_cache_key(url): data for url, data in batch.games if url})
+    await cache.set(index_cache_key(username, archive_url), encode_rows(batch.rows))
+
+    archive_url = archive_url.lower()
+    listed = await cache.get(index_archives_key(username))
+    if listed is not None and archive_url in json.loads(listed):
+        return
+
+    def add_archive(data: Optional[bytes]) -> bytes:
+        archives = json.loads(data) if data is not None else []
+        if archive_url not in archives:
+            archives.append(archive_url)
+        return json.dumps(archives).encode()
+
+    await cache.update(index_archives_key(username), add_archive)
+
+
+async def sync_game_index(username: str, game_index: GameIndex, cache: CacheBackend):
+    """
+    Merge index rows other workers published to the shared cache.
+
+    Reads only the cache, in at most two round trips. Settled months already
+    merged are skipped; recent months are re-read since they may have gained
+    games. With the in-process cache backend this only sees this worker's
+    own rows.
+    """
+    listed = await cache.get(index_archives_key(username))
+    if listed is None:
+        return
+
+    archives = [
+        archive_url for archive_url in json.loads(listed)
+        if not (game_index.has_archive(username, archive_url) and is_settled_archive(archive_url))
+    ]
+    values = await cache.get_many([index_cache_key(username, archive_url) for archive_url in archives])
+    for archive_url, data in zip(archives, values):
+        if data is not None:
+            game_index.add_rows(username, archive_url, decode_rows(data))
+
+
+async def load_games(game_urls: List[str], cache: CacheBackend) -> List[ChessGame]:
+    """
+    Load full games shared by publish_month() in a single cache round trip.
+
+    Args:
+        game_urls: Game URLs, in the order to return them
+
+    Returns:
+        Games in the order of game_urls; games evicted from the cache are skipped
+    """
+    values = await cache.get_many([game_cache_key(url) for url in game_urls])
+    return [ChessGame.model_validate_json(data) for data in values if data is not None]
+
+
+def analysis_cache_key(kind: str, username: str, payload: Any) -> str:
+    """Build a cache key for an analysis from a hash of its input"""
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return f"analysis:{kind}:{username.lower()}:{digest}"
 
 
 class AnalysisRequest(BaseModel):
@@ -48,21 +196,39 @@ async def root():
 
 
 @app.get("/api/archives/{username}")
-async def get_user_archives(username: str):
+async def get_user_archives(
+    username: str,
+    request: Request,
+    chess_service: ChessComAPIService = Depends(get_chess_service)
+):
     """Get list of available game archives for a user."""
     try:
         archives = await chess_service.fetch_archives(username)
-        return {"username": username, "archives": archives}
+        body = json.dumps({"username": username, "archives": archives}).encode()
+        return cached_json_response(request, body, SHORT_CACHE_CONTROL)
     except Exception as e:
         logger.error(f"Error fetching archives for {username}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/games/{username}/{year}/{month}", response_model=GameHistoryResponse)
-async def get_month_games(username: str, year: int, month: int):
+async def get_month_games(
+    username: str,
+    year: int,
+    month: int,
+    request: Request,
+    chess_service: ChessComAPIService = Depends(get_chess_service),
+    ingest_pool: IngestPool = Depends(get_ingest_pool),
+    cache: CacheBackend = Depends(get_cache),
+    game_index: GameIndex = Depends(get_game_index)
+):
     """
     Fetch games for a specific month.
 
+    Parsing and indexing run in the ingest process pool. Months that ended
+    more than a couple of days ago are served as immutable; more recent ones
+    are cached briefly.
+
     Args:
         username: Chess.com username
         year: Year (e.g., 2025)
@@ -74,29 +240,68 @@ async def get_month_games(username: str, year: int, month: int):
     try:
         logger.info(f"Fetching games for {username} - {year}/{month}")
         archive_url = f"https://api.chess.com/pub/player/{username}/games/{year}/{month:02d}"
-        games_data = await chess_service.fetch_month_games(archive_url)
-
-        games = []
-        for game_data in games_data:
-            try:
-                game = chess_service._parse_game(game_data, username)
-                games.append(game)
-            except Exception as e:
-                logger.warning(f"Failed to parse game: {e}")
-                continue
-
-        return GameHistoryResponse(
-            username=username,
-            total_games=len(games),
-            games=games
-        )
+        raw = await chess_service.fetch_month_games_raw(archive_url)
+        batch = await ingest_pool.ingest_month(raw, username)
+
+        game_index.add_rows(username, archive_url, batch.rows)
+        # An empty month may be a failed upstream fetch: don't let it replace
+        # shared rows, and never pin it as immutable
+        if batch.total_games:
+            await publish_month(username, archive_url, batch, cache)
+
+        if batch.total_games and is_settled_month(year, month):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = SHORT_CACHE_CONTROL
+        return cached_json_response(request, batch.body, cache_control)
     except Exception as e:
         logger.error(f"Error fetching games for {username} {year}/{month}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/users/{username}/vs/{opponent}", response_model=HeadToHeadResponse)
+async def get_head_to_head(
+    username: str,
+    opponent: str,
+    eco: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    cache: CacheBackend = Depends(get_cache),
+    game_index: GameIndex = Depends(get_game_index)
+):
+    """
+    Get a player's head-to-head record against an opponent.
+
+    Only games already fetched through /api/games (by any worker sharing the
+    cache) are included. Scores come from the index and the recent games
+    from the cache; Chess.com is never called.
+
+    Args:
+        username: Chess.com username
+        opponent: Opponent's Chess.com username
+        eco: Optional opening filter: a Chess.com opening URL or its slug
+            (e.g. "Sicilian-Defense"), including its variations; blank means all
+        limit: Number of recent games to return (1-100)
+
+    Returns:
+        HeadToHeadResponse with score, openings and recent games
+    """
+    try:
+        eco = (eco or "").strip() or None
+        await sync_game_index(username, game_index, cache)
+        game_urls = game_index.recent_games(username, opponent, eco=eco, limit=limit)
+        recent_games = await load_games(game_urls, cache)
+        return game_index.head_to_head(username, opponent, eco=eco, recent_games=recent_games)
+    except Exception as e:
+        logger.error(f"Error loading head-to-head for {username} vs {opponent}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/analyze")
-async def analyze_games(request: AnalysisRequest):
+async def analyze_games(
+    request: AnalysisRequest,
+    openai_service: Optional[OpenAIAnalysisService] = Depends(get_openai_service),
+    cache: CacheBackend = Depends(get_cache)
+):
     """
     Analyze games using OpenAI to identify recurring mistakes and provide actionable advice.
 
@@ -114,8 +319,13 @@ async def analyze_games(request: AnalysisRequest):
 
     try:
         logger.info(f"Analyzing {len(request.games)} games for {request.username}")
-        analysis = openai_service.analyze_games(request.games, request.username)
-        return {"analysis": analysis}
+
+        async def fill() -> bytes:
+            return openai_service.analyze_games(request.games, request.username).encode()
+
+        key = analysis_cache_key("games", request.username, request.games)
+        analysis = await cache.get_or_fill(key, fill, ttl=ANALYSIS_TTL, lock_ttl=ANALYSIS_LOCK_TTL)
+        return {"analysis": analysis.decode()}
     except Exception as e:
         logger.error(f"Error analyzing games: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -127,7 +337,11 @@ class SingleGameAnalysisRequest(BaseModel):
 
 
 @app.post("/api/analyze-game")
-async def analyze_single_game(request: SingleGameAnalysisRequest):
+async def analyze_single_game(
+    request: SingleGameAnalysisRequest,
+    openai_service: Optional[OpenAIAnalysisService] = Depends(get_openai_service),
+    cache: CacheBackend = Depends(get_cache)
+):
     """
     Analyze a single game using OpenAI to provide detailed coaching feedback.
 
@@ -145,8 +359,13 @@ async def analyze_single_game(request: SingleGameAnalysisRequest):
 
     try:
         logger.info(f"Analyzing single game for {request.username}")
-        analysis = openai_service.analyze_single_game(request.game, request.username)
-        return {"analysis": analysis}
+
+        async def fill() -> bytes:
+            return openai_service.analyze_single_game(request.game, request.username).encode()
+
+        key = analysis_cache_key("game", request.username, request.game)
+        analysis = await cache.get_or_fill(key, fill, ttl=ANALYSIS_TTL, lock_ttl=ANALYSIS_LOCK_TTL)
+        return {"analysis": analysis.decode()}
     except Exception as e:
         logger.error(f"Error analyzing game: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -48,3 +48,25 @@ class GameHistoryResponse(BaseModel):
     username: str
     total_games: int
     games: List[ChessGame]
+
+
+class OpeningRecord(BaseModel):
+    """A player's record in a single opening"""
+    eco: str
+    name: str
+    games: int = 0
+    wins: int = 0
+    losses: int = 0
+    draws: int = 0
+
+
+class HeadToHeadResponse(BaseModel):
+    """Response containing a player's record against a specific opponent"""
+    username: str
+    opponent: str
+    total_games: int
+    wins: int
+    losses: int
+    draws: int
+    openings: List[OpeningRecord]
+    recent_games: List[ChessGame]
@@ -0,0 +1,16 @@
+from datetime import datetime, timedelta, timezone
+
+# How long a month's archive may keep changing after the month ends
+# (daily games finishing late, lag in Chess.com's own cache)
+MONTH_SETTLE_GRACE = timedelta(days=2)
+
+
+def is_settled_month(year: int, month: int) -> bool:
+    """Check whether a year/month ended more than MONTH_SETTLE_GRACE ago (UTC)"""
+    if not 1 <= month <= 12:
+        return False
+    if month == 12:
+        month_end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        month_end = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) >= month_end + MONTH_SETTLE_GRACE
@@ -0,0 +1,533 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Interface for byte caches shared by the Chess.com and analysis paths.
+
+    Backends provide get/set plus a token-based lock with expiry; get_or_fill
+    builds on them so only one worker fills a missing key while the others
+    wait for its result.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Get several values at once, None for each missing key"""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None):
+        """Set several values at once, all with the same TTL"""
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        """Try to take a lock, returning its token or None if it's held elsewhere"""
+        raise NotImplementedError
+
+    async def release_lock(self, key: str, token: str):
+        """Release a lock, only if it's still held with this token"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    async def get_or_fill(
+        self,
+        key: str,
+        fill: Callable[[], Awaitable[bytes]],
+        ttl: Optional[float] = None,
+        lock_ttl: float = 60.0
+    ) -> bytes:
+        """
+        Get a cached value, computing and storing it on a miss.
+
+        Only the caller holding the fill lock runs fill(); others poll until
+        the value appears. If the lock holder dies, its lock expires after
+        lock_ttl and a waiter takes over. Exceptions from fill() propagate
+        and nothing is cached.
+
+        Args:
+            key: Cache key
+            fill: Coroutine function producing the value
+            ttl: Seconds to keep the value (None keeps it until evicted)
+            lock_ttl: Seconds before an abandoned fill lock expires
+
+        Returns:
+            Cached or freshly computed value
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f"lock:{key}"
+        delay = 0.05
+        while True:
+            token = await self.acquire_lock(lock_key, lock_ttl)
+            if token is not None:
+                try:
+                    # Another worker may have filled it between our get and the lock
+                    value = await self.get(key)
+                    if value is None:
+                        value = await fill()
+                        await self.set(key, value, ttl)
+                    return value
+                finally:
+                    await self.release_lock(lock_key, token)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            value = await self.get(key)
+            if value is not None:
+                return value
+
+    async def update(
+        self,
+        key: str,
+        change: Callable[[Optional[bytes]], bytes],
+        ttl: Optional[float] = None,
+        lock_ttl: float = 10.0
+    ) -> bytes:
+        """
+        Read, change and write back a value under its lock.
+
+        Concurrent updates from other workers are applied one after another
+        instead of overwriting each other.
+
+        Args:
+            key: Cache key
+            change: Function from the current value (None if missing) to the new one
+            ttl: Seconds to keep the new value (None keeps it until evicted)
+            lock_ttl: Seconds before an abandoned update lock expires
+
+        Returns:
+            The new value
+        """
+        lock_key = f"lock:{key}"
+        delay = 0.01
+        token = await self.acquire_lock(lock_key, lock_ttl)
+        while token is None:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            token = await self.acquire_lock(lock_key, lock_ttl)
+
+        try:
+            value = change(await self.get(key))
+            await self.set(key, value, ttl)
+            return value
+        finally:
+            await self.release_lock(lock_key, token)
+
+
+class InProcessCache(CacheBackend):
+    """
+    Cache held in this process's memory; not shared between workers.
+
+    Bounded by total value size: the least recently used entries are evicted
+    once max_bytes is exceeded.
+    """
+
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("CACHE_MAX_BYTES", self.DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self._size = 0
+        # Least recently used first
+        self._values: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._values.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        if key in self._values:
+            self._remove(key)
+        if len(value) > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._values[key] = (value, expires_at)
+        self._size += len(value)
+        self._evict()
+
+    def _remove(self, key: str):
+        value, _ = self._values.pop(key)
+        self._size -= len(value)
+
+    def _evict(self):
+        """Drop least recently used entries until under max_bytes"""
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._values)))
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        now = time.monotonic()
+        held = self._locks.get(key)
+        if held is not None and held[1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._locks[key] = (token, now + ttl)
+        return token
+
+    async def release_lock(self, key: str, token: str):
+        held = self._locks.get(key)
+        if held is not None and held[0] == token:
+            del self._locks[key]
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache in a SQLite file shared by all workers on one host.
+
+    Point it at a tmpfs path (e.g. /dev/shm) to keep it in shared memory.
+    At most every PURGE_INTERVAL seconds, a write purges expired rows and,
+    once values total more than max_bytes, evicts the oldest written ones.
+    """
+
+    PURGE_INTERVAL = 60.0
+    MAX_PARAMS = 500
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("CACHE_MAX_BYTES", InProcessCache.DEFAULT_MAX_BYTES))
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._purge()
+        self._last_purge = time.monotonic()
+        # Serializes use of the single connection across to_thread calls
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn: Callable[[], object]):
+        async with self._lock:
+            return await asyncio.to_thread(fn)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        def query():
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            return row[0] if row else None
+
+        return await self._run(query)
+
+    def _purge_due(self) -> bool:
+        """Check whether this write should purge, and if so restart the interval"""
+        if time.monotonic() - self._last_purge < self.PURGE_INTERVAL:
+            return False
+        self._last_purge = time.monotonic()
+        return True
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        purge = self._purge_due()
+
+        def store():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            if purge:
+                self._purge()
+
+        await self._run(store)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        def query():
+            found = {}
+            now = time.time()
+            # Stay under SQLite's limit on bound parameters per statement
+            for start in range(0, len(keys), self.MAX_PARAMS):
+                chunk = keys[start:start + self.MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders}) "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (*chunk, now),
+                ).fetchall())
+            return [found.get(key) for key in keys]
+
+        return await self._run(query)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        purge = self._purge_due()
+
+        def store():
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, value in items.items()],
+                )
+            if purge:
+                self._purge()
+
+        await self._run(store)
+
+    def _purge(self):
+        """Delete expired values and locks, then evict the oldest values over max_bytes"""
+        now = time.time()
+        self._conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._conn.execute("DELETE FROM locks WHERE expires_at <= ?", (now,))
+
+        # length() of a blob is read from the row header, without loading the value
+        excess = self._conn.execute("SELECT COALESCE(SUM(length(value)), 0) FROM cache").fetchone()[0]
+        excess -= self.max_bytes
+        if excess <= 0:
+            return
+        # INSERT OR REPLACE gives a rewritten key a new rowid, so rowid order is write order
+        evicted = []
+        for rowid, size in self._conn.execute("SELECT rowid, length(value) FROM cache ORDER BY rowid"):
+            if excess <= 0:
+                break
+            evicted.append((rowid,))
+            excess -= size
+        self._conn.executemany("DELETE FROM cache WHERE rowid = ?", evicted)
+        logger.info(f"Evicted {len(evicted)} entries from the SQLite cache")
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+
+        def take():
+            now = time.time()
+            self._conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+            # The primary key makes this insert the atomic test-and-set across processes
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO locks (key, token, expires_at) VALUES (?, ?, ?)",
+                (key, token, now + ttl),
+            )
+            return token if cursor.rowcount == 1 else None
+
+        return await self._run(take)
+
+    async def release_lock(self, key: str, token: str):
+        await self._run(lambda: self._conn.execute(
+            "DELETE FROM locks WHERE key = ? AND token = ?", (key, token)
+        ))
+
+    async def close(self):
+        self._conn.close()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RedisCache(CacheBackend):
+    """Cache on a Redis-protocol server, shared by workers across hosts"""
+
+    # Deletes the lock only if we still own it
+    _RELEASE_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, password: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self._reader = None
+        self._writer = None
+        # One request/response in flight at a time on the shared connection
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._disconnect()
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._send("AUTH", self.password)
+            if self.db:
+                await self._send("SELECT", str(self.db))
+        except BaseException:
+            self._disconnect()
+            raise
+
+    def _disconnect(self):
+        """Drop the connection without waiting, so any unread reply goes with it"""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _send(self, *args):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            if count == -1:
+                return None
+            return [await self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+    async def _command(self, *args, retry: bool = True):
+        """
+        Send a command and read its reply.
+
+        With retry, a command whose connection fails is sent once more on a
+        new connection, so it must be safe to apply twice: the first attempt
+        may have reached the server with only its reply lost.
+        """
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                try:
+                    return await self._send(*args)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if not retry:
+                        raise
+                    # Reconnect once; the server may have dropped an idle connection
+                    await self._connect()
+                    return await self._send(*args)
+            except RedisError:
+                # The error reply was read in full, so the connection is still in sync
+                raise
+            except BaseException:
+                # Cancelled or failed between writing a command and reading its reply:
+                # the reply may still be on the socket, and the next command would
+                # take it for its own
+                self._disconnect()
+                raise
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._command("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        if ttl is None:
+            await self._command("SET", key, value)
+        else:
+            await self._command("SET", key, value, "PX", int(ttl * 1000))
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self._command("MGET", *keys)
+
+    async def set_many(self, items: Dict[str, bytes], ttl: Optional[float] = None):
+        if not items:
+            return
+        if ttl is not None:
+            await super().set_many(items, ttl)
+            return
+        args = []
+        for key, value in items.items():
+            args += [key, value]
+        await self._command("MSET", *args)
+
+    async def acquire_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        command = ("SET", key, token, "NX", "PX", int(ttl * 1000))
+        try:
+            reply = await self._command(*command, retry=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The lost attempt may have taken the lock; retry with the same
+            # token and count a lock already held with it as ours
+            reply = await self._command(*command)
+            if reply != "OK" and await self._command("GET", key) == token.encode():
+                reply = "OK"
+        return token if reply == "OK" else None
+
+    async def release_lock(self, key: str, token: str):
+        await self._command("EVAL", self._RELEASE_SCRIPT, "1", key, token)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._reader = self._writer = None
+
+
+def create_cache_backend(url: Optional[str] = None) -> CacheBackend:
+    """
+    Create a cache backend from a URL.
+
+    Supported URLs:
+        memory://                          in-process (default)
+        sqlite:///cache.db                 SQLite file relative to the working directory
+        sqlite:////dev/shm/cache.db        SQLite file at an absolute path (note four slashes)
+        redis://[:password@]host[:port][/db]
+
+    Args:
+        url: Backend URL, defaults to the CACHE_URL environment variable
+
+    Returns:
+        CacheBackend instance
+    """
+    url = url or os.getenv("CACHE_URL", "memory://")
+    parsed = urlparse(url)
+
+    if parsed.scheme == "memory":
+        backend = InProcessCache()
+    elif parsed.scheme == "sqlite":
+        # sqlite:///relative.db and sqlite:////absolute.db, as in SQLAlchemy
+        path = parsed.path[1:]
+        if parsed.netloc or not path:
+            # sqlite://cache.db would otherwise open a private temporary database
+            raise ValueError(
+                f"Invalid SQLite cache URL: {url} (use sqlite:///relative.db or sqlite:////absolute.db)"
+            )
+        backend = SQLiteCache(path)
+    elif parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        backend = RedisCache(parsed.hostname or "localhost", parsed.port or 6379, db, parsed.password)
+    else:
+        raise ValueError(f"Unsupported cache URL: {url}")
+
+    logger.info(f"Using {type(backend).__name__} for caching")
+    return backend
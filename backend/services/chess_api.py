@@ -1,7 +1,9 @@
-import httpx
+import json
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from models import ChessGame
+from months import is_settled_month
+from services.cache import CacheBackend
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +13,25 @@ class ChessComAPIService:
 
     BASE_URL = "https://api.chess.com/pub"
 
-    def __init__(self):
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            headers={"User-Agent": "ChessGameAnalyzer/1.0"}
-        )
+    # Cache lifetimes in seconds; settled months never change, the rest can grow
+    ARCHIVES_TTL = 300
+    CURRENT_MONTH_TTL = 60
+    PAST_MONTH_TTL = 30 * 24 * 3600
+
+    def __init__(self, cache: Optional[CacheBackend] = None):
+        self._client = None
+        self.cache = cache
+
+    @property
+    def client(self):
+        """HTTP client, created on first use so it's bound to the running event loop"""
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                timeout=30.0,
+                headers={"User-Agent": "ChessGameAnalyzer/1.0"}
+            )
+        return self._client
 
     async def fetch_archives(self, username: str) -> List[str]:
         """
@@ -27,14 +43,14 @@ class ChessComAPIService:
         Returns:
             List of archive URLs
         """
+        import httpx
+
         url = f"{self.BASE_URL}/player/{username}/games/archives"
         logger.info(f"Fetching archives from: {url}")
 
         try:
-            response = await self.client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("archives", [])
+            raw = await self._get_cached(f"chess:archives:{username.lower()}", url, self.ARCHIVES_TTL)
+            return json.loads(raw).get("archives", [])
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 raise ValueError(f"User '{username}' not found on Chess.com")
@@ -52,16 +68,51 @@ class ChessComAPIService:
         Returns:
             List of game dictionaries
         """
+        raw = await self.fetch_month_games_raw(archive_url)
+        if not raw:
+            return []
+        return json.loads(raw).get("games", [])
+
+    async def fetch_month_games_raw(self, archive_url: str) -> bytes:
+        """
+        Fetch the undecoded JSON body of a monthly archive.
+
+        Decoding is left to the caller so it can happen off the event loop.
+
+        Args:
+            archive_url: URL to monthly archive
+
+        Returns:
+            Response body, or empty bytes if the fetch failed
+        """
         logger.info(f"Fetching games from archive: {archive_url}")
 
         try:
-            response = await self.client.get(archive_url)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("games", [])
+            key = f"chess:month:{archive_url.lower()}"
+            return await self._get_cached(key, archive_url, self.month_ttl(archive_url))
         except Exception as e:
             logger.error(f"Error fetching games from {archive_url}: {e}")
-            return []
+            return b""
+
+    async def _download(self, url: str) -> bytes:
+        """GET a URL and return its body, raising on HTTP errors"""
+        response = await self.client.get(url)
+        response.raise_for_status()
+        return response.content
+
+    async def _get_cached(self, key: str, url: str, ttl: float) -> bytes:
+        """Download a URL through the cache, so only one worker fetches a missing key"""
+        if self.cache is None:
+            return await self._download(url)
+        return await self.cache.get_or_fill(key, lambda: self._download(url), ttl=ttl)
+
+    def is_settled_archive(self, archive_url: str) -> bool:
+        """Check whether a monthly archive URL ending in /YYYY/MM can no longer change"""
+        return is_settled_archive(archive_url)
+
+    def month_ttl(self, archive_url: str) -> float:
+        """Cache lifetime for a monthly archive, and for data derived from it"""
+        return self.PAST_MONTH_TTL if self.is_settled_archive(archive_url) else self.CURRENT_MONTH_TTL
 
     async def fetch_user_games(self, username: str, limit_months: int = 12) -> List[ChessGame]:
         """
@@ -103,26 +154,42 @@ class ChessComAPIService:
 
     def _parse_game(self, game_data: Dict[str, Any], username: str) -> ChessGame:
         """Parse raw game data into ChessGame model"""
-        white = game_data.get("white", {})
-        black = game_data.get("black", {})
-
-        return ChessGame(
-            url=game_data.get("url", ""),
-            pgn=game_data.get("pgn", ""),
-            time_control=game_data.get("time_control", ""),
-            end_time=game_data.get("end_time", 0),
-            rated=game_data.get("rated", False),
-            time_class=game_data.get("time_class", ""),
-            rules=game_data.get("rules", "chess"),
-            white_username=white.get("username", ""),
-            white_rating=white.get("rating", 0),
-            white_result=white.get("result", ""),
-            black_username=black.get("username", ""),
-            black_rating=black.get("rating", 0),
-            black_result=black.get("result", ""),
-            eco=game_data.get("eco"),
-        )
+        return parse_game(game_data, username)
 
     async def close(self):
         """Close the HTTP client"""
-        await self.client.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def parse_game(game_data: Dict[str, Any], username: str) -> ChessGame:
+    """Parse raw game data into ChessGame model"""
+    white = game_data.get("white", {})
+    black = game_data.get("black", {})
+
+    return ChessGame(
+        url=game_data.get("url", ""),
+        pgn=game_data.get("pgn", ""),
+        time_control=game_data.get("time_control", ""),
+        end_time=game_data.get("end_time", 0),
+        rated=game_data.get("rated", False),
+        time_class=game_data.get("time_class", ""),
+        rules=game_data.get("rules", "chess"),
+        white_username=white.get("username", ""),
+        white_rating=white.get("rating", 0),
+        white_result=white.get("result", ""),
+        black_username=black.get("username", ""),
+        black_rating=black.get("rating", 0),
+        black_result=black.get("result", ""),
+        eco=game_data.get("eco"),
+    )
+
+
+def is_settled_archive(archive_url: str) -> bool:
+    """Check whether a monthly archive URL ending in /YYYY/MM can no longer change"""
+    try:
+        year, month = (int(part) for part in archive_url.rstrip("/").split("/")[-2:])
+    except ValueError:
+        return False
+    return is_settled_month(year, month)
@@ -0,0 +1,243 @@
+import heapq
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from models import ChessGame, HeadToHeadResponse, OpeningRecord
+
+logger = logging.getLogger(__name__)
+
+LOSS_RESULTS = {"checkmated", "resigned", "timeout", "abandoned", "lose"}
+
+
+class IndexRow(NamedTuple):
+    """Summary of one game for the index, compact enough to ship out of a worker process"""
+    url: str
+    opponent: str
+    eco: Optional[str]
+    result: str  # win, loss or draw
+    end_time: int
+
+
+def index_rows(username: str, games: Iterable[ChessGame]) -> List[IndexRow]:
+    """
+    Build index rows for a player's games.
+
+    Games without a URL or not involving the player are skipped.
+
+    Args:
+        username: Chess.com username the games were fetched for
+        games: Parsed ChessGame objects
+
+    Returns:
+        List of IndexRow tuples
+    """
+    player = username.lower()
+    rows = []
+    for game in games:
+        if not game.url:
+            continue
+        if game.white_username.lower() == player:
+            opponent, result = game.black_username.lower(), game.white_result
+        elif game.black_username.lower() == player:
+            opponent, result = game.white_username.lower(), game.black_result
+        else:
+            continue
+        rows.append(IndexRow(
+            url=game.url,
+            opponent=opponent,
+            eco=game.eco,
+            result=_classify_result(result),
+            end_time=game.end_time,
+        ))
+    return rows
+
+
+def encode_rows(rows: List[IndexRow]) -> bytes:
+    """Serialize index rows compactly for the shared cache"""
+    return json.dumps(rows, separators=(",", ":")).encode()
+
+
+def decode_rows(data: bytes) -> List[IndexRow]:
+    """Deserialize index rows written by encode_rows()"""
+    return [IndexRow(*row) for row in json.loads(data)]
+
+
+class GameIndex:
+    """
+    In-memory inverted index over ingested games, keyed by opponent and ECO.
+
+    Only game summaries are kept; callers keep full games (with PGN) in the
+    shared cache by URL. Each worker holds its own index. Callers keep
+    workers consistent by publishing each month's rows to the shared cache
+    and merging rows other workers published before answering queries.
+    """
+
+    def __init__(self):
+        # Game id (URL) -> end time
+        self._end_times: Dict[str, int] = {}
+        # Player -> opponent -> game ids
+        self._by_opponent: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        # Player -> ECO -> game ids
+        self._by_eco: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        # Player -> archive URLs (lowercased) whose rows have been merged
+        self._loaded: Dict[str, Set[str]] = defaultdict(set)
+        # Player -> opponent -> ECO (None for all openings) -> [wins, losses, draws]
+        self._records: Dict[str, Dict[str, Dict[Optional[str], List[int]]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(lambda: [0, 0, 0]))
+        )
+
+    def add_rows(self, username: str, archive_url: str, rows: Iterable[IndexRow]) -> int:
+        """
+        Merge precomputed index rows for a player into the index.
+
+        Re-adding a game that is already indexed is a no-op, so the same
+        month can be ingested repeatedly.
+
+        Args:
+            username: Chess.com username the games were fetched for
+            archive_url: Monthly archive the games came from
+            rows: IndexRow tuples from index_rows()
+
+        Returns:
+            Number of games newly indexed
+        """
+        player = username.lower()
+        self._loaded[player].add(archive_url.lower())
+        added = 0
+        for row in rows:
+            game_ids = self._by_opponent[player][row.opponent]
+            if row.url in game_ids:
+                continue
+
+            added += 1
+            self._end_times[row.url] = row.end_time
+            game_ids.add(row.url)
+
+            slot = ("win", "loss", "draw").index(row.result)
+            records = self._records[player][row.opponent]
+            records[None][slot] += 1
+            if row.eco:
+                self._by_eco[player][row.eco].add(row.url)
+                records[row.eco][slot] += 1
+
+        if added:
+            logger.info(f"Indexed {added} new games for {username}")
+        return added
+
+    def has_archive(self, username: str, archive_url: str) -> bool:
+        """Check whether rows from a monthly archive have been merged for a player"""
+        return archive_url.lower() in self._loaded.get(username.lower(), set())
+
+    def recent_games(
+        self,
+        username: str,
+        opponent: str,
+        eco: Optional[str] = None,
+        limit: int = 10
+    ) -> List[str]:
+        """
+        Get the most recent indexed games between a player and an opponent.
+
+        Args:
+            username: Chess.com username
+            opponent: Opponent's Chess.com username
+            eco: Optional opening filter, see head_to_head()
+            limit: Maximum number of games to return
+
+        Returns:
+            Game URLs, most recent first
+        """
+        player = username.lower()
+        ids = self._by_opponent.get(player, {}).get(opponent.lower(), set())
+        if eco is not None:
+            by_eco = self._by_eco.get(player, {})
+            matched = self._matching_openings(player, opponent, eco)
+            ids = ids & set().union(*(by_eco.get(url, set()) for url in matched))
+
+        return heapq.nlargest(limit, ids, key=self._end_times.__getitem__)
+
+    def head_to_head(
+        self,
+        username: str,
+        opponent: str,
+        eco: Optional[str] = None,
+        recent_games: Optional[List[ChessGame]] = None
+    ) -> HeadToHeadResponse:
+        """
+        Summarize a player's record against an opponent.
+
+        Args:
+            username: Chess.com username
+            opponent: Opponent's Chess.com username
+            eco: Optional opening filter: a Chess.com opening URL or its slug
+                (e.g. "Sicilian-Defense"), matched case-insensitively and
+                including its variations
+            recent_games: Games to include, loaded from recent_games() URLs
+
+        Returns:
+            HeadToHeadResponse with score, per-opening records and recent games
+        """
+        player = username.lower()
+        records = self._records.get(player, {}).get(opponent.lower(), {})
+        if eco is None:
+            wins, losses, draws = records.get(None, [0, 0, 0])
+            matched = [opening for opening in records if opening is not None]
+        else:
+            matched = self._matching_openings(player, opponent, eco)
+            wins, losses, draws = (sum(records[url][slot] for url in matched) for slot in range(3))
+
+        openings = [
+            OpeningRecord(
+                eco=opening,
+                name=_opening_name(opening),
+                games=sum(records[opening]),
+                wins=records[opening][0],
+                losses=records[opening][1],
+                draws=records[opening][2],
+            )
+            for opening in matched
+        ]
+
+        return HeadToHeadResponse(
+            username=username,
+            opponent=opponent,
+            total_games=wins + losses + draws,
+            wins=wins,
+            losses=losses,
+            draws=draws,
+            openings=sorted(openings, key=lambda o: o.games, reverse=True),
+            recent_games=recent_games or [],
+        )
+
+    def _matching_openings(self, player: str, opponent: str, eco: str) -> List[str]:
+        """Get the opening URLs played against an opponent that match an opening filter"""
+        query = _opening_slug(eco.strip()).lower()
+        records = self._records.get(player, {}).get(opponent.lower(), {})
+        matched = []
+        for url in records:
+            if url is None:
+                continue
+            slug = _opening_slug(url).lower()
+            if slug == query or slug.startswith(query + "-"):
+                matched.append(url)
+        return matched
+
+
+def _opening_slug(eco: str) -> str:
+    """Get the slug of a Chess.com opening URL (e.g. Sicilian-Defense-Open)"""
+    return eco.split("/openings/")[-1].rstrip("/")
+
+
+def _classify_result(result: str) -> str:
+    """Classify a Chess.com result code as 'win', 'loss' or 'draw'"""
+    if result == "win":
+        return "win"
+    if result in LOSS_RESULTS:
+        return "loss"
+    return "draw"
+
+
+def _opening_name(eco: str) -> str:
+    """Extract a readable opening name from a Chess.com ECO URL"""
+    return _opening_slug(eco).replace("-", " ") if "/openings/" in eco else "Unknown"
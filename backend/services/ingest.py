@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+from services.chess_api import parse_game
+from services.game_index import IndexRow, index_rows
+
+logger = logging.getLogger(__name__)
+
+# Archives smaller than this are parsed inline; shipping them to a worker costs more than it saves
+INLINE_THRESHOLD_BYTES = 64 * 1024
+# Upper bound on the default pool size; parsing one archive uses one process
+MAX_DEFAULT_WORKERS = 4
+
+
+class MonthBatch(NamedTuple):
+    """Result of ingesting one monthly archive, returned from a worker process"""
+    username: str
+    games: List[Tuple[str, bytes]]  # (game URL, serialized ChessGame)
+    failed: int
+    rows: List[IndexRow]
+
+    @property
+    def total_games(self) -> int:
+        return len(self.games)
+
+    @property
+    def body(self) -> bytes:
+        """Serialized GameHistoryResponse, assembled from the already serialized games"""
+        return b'{"username":%s,"total_games":%d,"games":[%s]}' % (
+            json.dumps(self.username).encode(),
+            len(self.games),
+            b",".join(data for _, data in self.games),
+        )
+
+
+def ingest_month(raw: bytes, username: str) -> MonthBatch:
+    """
+    Decode, parse and index a raw monthly archive.
+
+    Runs in a worker process, so it takes and returns only picklable,
+    compact values: the undecoded archive body in, the serialized games
+    and summary-only index rows out.
+
+    Args:
+        raw: Undecoded Chess.com monthly archive JSON
+        username: Chess.com username the archive belongs to
+
+    Returns:
+        MonthBatch with the serialized games and index rows
+    """
+    games_data = json.loads(raw).get("games", []) if raw else []
+
+    games = []
+    failed = 0
+    for game_data in games_data:
+        try:
+            games.append(parse_game(game_data, username))
+        except Exception:
+            failed += 1
+
+    return MonthBatch(
+        username=username,
+        games=[(game.url, game.model_dump_json().encode()) for game in games],
+        failed=failed,
+        rows=index_rows(username, games),
+    )
+
+
+def default_workers() -> int:
+    """
+    Default ingest pool size for one server worker.
+
+    Each uvicorn/gunicorn worker has its own pool, so the CPUs are split
+    between the WEB_CONCURRENCY server workers, capped at MAX_DEFAULT_WORKERS.
+    """
+    web_workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return max(1, min((os.cpu_count() or 1) // web_workers, MAX_DEFAULT_WORKERS))
+
+
+class IngestPool:
+    """Process pool for CPU-bound ingestion so large archives don't block the event loop"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: Worker process count. Defaults to INGEST_WORKERS or
+                default_workers(); 0 runs everything inline on the event loop.
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv("INGEST_WORKERS", default_workers()))
+        self.max_workers = max_workers
+        self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args: Any, size: Optional[int] = None) -> Any:
+        """
+        Run a module-level function in the pool and await its result.
+
+        Args:
+            fn: Picklable function to run
+            *args: Picklable arguments
+            size: Optional payload size in bytes; small payloads run inline
+
+        Returns:
+            The function's return value
+        """
+        if self.max_workers == 0 or (size is not None and size < INLINE_THRESHOLD_BYTES):
+            return fn(*args)
+
+        if self._executor is None:
+            # Spawn rather than fork: the server process has running threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started ingest pool with {self.max_workers} workers")
+
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died and the executor can't be reused; start a fresh one on the next call
+            logger.error("Ingest pool broken, restarting it on next use")
+            if self._executor is executor:
+                self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def ingest_month(self, raw: bytes, username: str) -> MonthBatch:
+        """Decode, parse and index a raw monthly archive in the pool"""
+        batch = await self.run(ingest_month, raw, username, size=len(raw))
+        if batch.failed:
+            logger.warning(f"Failed to parse {batch.failed} games for {username}")
+        return batch
+
+    def close(self):
+        """Shut down worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
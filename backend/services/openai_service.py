@@ -1,5 +1,4 @@
 import os
-from openai import OpenAI
 from typing import List, Dict, Any
 import logging
 
@@ -13,6 +12,8 @@ class OpenAIAnalysisService:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
+        # Deferred: the OpenAI SDK is slow to import and only needed once analysis is requested
+        from openai import OpenAI
         self.client = OpenAI(api_key=api_key)
 
     def analyze_games(self, games: List[Dict[str, Any]], username: str) -> str:
@@ -386,6 +387,10 @@ Be direct and specific. Reference exact move numbers. Make this feel like a one-
             logger.error(f"Error analyzing single game: {e}")
             raise Exception(f"Failed to analyze game: {str(e)}")
 
+    def close(self):
+        """Close the OpenAI HTTP client"""
+        self.client.close()
+
     def _extract_move_count(self, pgn: str) -> int:
         """Extract the total number of moves from PGN"""
         if not pgn:
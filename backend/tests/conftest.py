@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.chess_api import ChessComAPIService
+
+SICILIAN = "https://www.chess.com/openings/Sicilian-Defense-Open"
+RUY_LOPEZ = "https://www.chess.com/openings/Ruy-Lopez-Opening"
+
+
+def game(i, white, black, white_result, black_result, eco):
+    return {
+        "url": f"https://www.chess.com/game/live/{i}",
+        "pgn": f"1. e4 c5 {i}",
+        "end_time": i,
+        "time_class": "blitz",
+        "white": {"username": white, "rating": 1500, "result": white_result},
+        "black": {"username": black, "rating": 1500, "result": black_result},
+        "eco": eco,
+    }
+
+
+ARCHIVE = json.dumps({"games": [
+    game(1, "alice", "Bob", "win", "resigned", SICILIAN),
+    game(2, "bob", "Alice", "win", "checkmated", SICILIAN),
+    game(3, "Alice", "bob", "agreed", "agreed", RUY_LOPEZ),
+    game(4, "alice", "carol", "win", "timeout", SICILIAN),
+]}).encode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    downloads = []
+
+    async def download(self, url):
+        downloads.append(url)
+        if url.endswith("/archives"):
+            return json.dumps({"archives": ["https://api.chess.com/pub/player/alice/games/2020/01"]}).encode()
+        return ARCHIVE
+
+    monkeypatch.setattr(ChessComAPIService, "_download", download)
+    monkeypatch.setenv("INGEST_WORKERS", "0")
+    with TestClient(main.app) as client:
+        client.downloads = downloads
+        yield client
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Dict, Optional, Set, Tuple
+
+
+class RedisStandIn:
+    """
+    Minimal Redis-protocol server for tests.
+
+    Supports the commands RedisCache uses: GET, MGET, SET (with NX/PX), MSET,
+    DEL, EVAL of the lock release script, AUTH, SELECT and PING. Keys listed in delays
+    have their GET reply held back for that many seconds. A SET of a key listed
+    in lose_reply is applied, then the connection is dropped without a reply.
+    """
+
+    def __init__(self):
+        self.port: Optional[int] = None
+        self.delays: Dict[bytes, float] = {}
+        self.lose_reply: Set[bytes] = set()
+        self._store: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._store[key]
+            return None
+        return value
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                reply = await self._execute(args)
+                if args[0].upper() == b"SET" and args[1] in self.lose_reply:
+                    self.lose_reply.discard(args[1])
+                    break
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _execute(self, args) -> bytes:
+        command = args[0].upper()
+        if command in (b"PING", b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            if args[1] in self.delays:
+                await asyncio.sleep(self.delays[args[1]])
+            return _bulk(self._get(args[1]))
+        if command == b"MGET":
+            return b"*%d\r\n" % len(args[1:]) + b"".join(_bulk(self._get(key)) for key in args[1:])
+        if command == b"MSET":
+            for key, value in zip(args[1::2], args[2::2]):
+                self._store[key] = (value, None)
+            return b"+OK\r\n"
+        if command == b"SET":
+            options = [arg.upper() for arg in args[3:]]
+            expires_at = None
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000
+            if b"NX" in options and self._get(args[1]) is not None:
+                return b"$-1\r\n"
+            self._store[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            return b":%d\r\n" % (self._store.pop(args[1], None) is not None)
+        if command == b"EVAL":
+            # Only the compare-and-delete lock release script is supported
+            key, token = args[3], args[4]
+            if self._get(key) == token:
+                del self._store[key]
+                return b":1\r\n"
+            return b":0\r\n"
+        return b"-ERR unknown command\r\n"
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
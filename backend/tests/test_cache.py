@@ -0,0 +1,223 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+from redis_standin import RedisStandIn
+from services.cache import InProcessCache, RedisCache, SQLiteCache, create_cache_backend
+
+BACKENDS = ["memory", "sqlite", "redis"]
+
+
+@asynccontextmanager
+async def workers(kind, tmp_path, count=4):
+    """
+    Yield cache instances that stand in for separate workers.
+
+    The in-process backend can't be shared between workers, so its "workers"
+    are coroutines sharing one instance.
+    """
+    server = None
+    if kind == "memory":
+        shared = InProcessCache()
+        caches = [shared] * count
+    elif kind == "sqlite":
+        caches = [SQLiteCache(str(tmp_path / "cache.db")) for _ in range(count)]
+    else:
+        server = RedisStandIn()
+        await server.start()
+        caches = [RedisCache("127.0.0.1", server.port) for _ in range(count)]
+    try:
+        yield caches
+    finally:
+        for cache in set(caches):
+            await cache.close()
+        if server is not None:
+            await server.stop()
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_contended_key_is_filled_once(kind, tmp_path):
+    async def scenario():
+        calls = 0
+
+        async def fill():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return b"value"
+
+        async with workers(kind, tmp_path) as caches:
+            results = await asyncio.gather(*[
+                caches[i % len(caches)].get_or_fill("key", fill, ttl=60) for i in range(12)
+            ])
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [b"value"] * 12
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_expired_lock_is_taken_over(kind, tmp_path):
+    async def scenario():
+        async with workers(kind, tmp_path, count=2) as (dead, alive):
+            # A worker that took the fill lock and died without releasing it
+            assert await dead.acquire_lock("lock:key", 0.3) is not None
+
+            async def fill():
+                return b"value"
+
+            start = time.monotonic()
+            value = await alive.get_or_fill("key", fill, ttl=60)
+            return value, time.monotonic() - start
+
+    value, elapsed = asyncio.run(scenario())
+    assert value == b"value"
+    assert elapsed >= 0.25
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_failed_fill_caches_nothing(kind, tmp_path):
+    async def scenario():
+        async with workers(kind, tmp_path, count=1) as (cache,):
+            async def broken():
+                raise RuntimeError("upstream down")
+
+            with pytest.raises(RuntimeError):
+                await cache.get_or_fill("key", broken, ttl=60)
+            assert await cache.get("key") is None
+
+            # The lock was released, so the next caller fills straight away
+            async def fill():
+                return b"value"
+
+            start = time.monotonic()
+            value = await cache.get_or_fill("key", fill, ttl=60)
+            return value, time.monotonic() - start
+
+    value, elapsed = asyncio.run(scenario())
+    assert value == b"value"
+    assert elapsed < 0.05
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_get_many_and_set_many(kind, tmp_path):
+    async def scenario():
+        async with workers(kind, tmp_path, count=1) as (cache,):
+            await cache.set_many({"a": b"1", "b": b"2"})
+            await cache.set_many({"c": b"3"}, ttl=60)
+            return await cache.get_many(["a", "missing", "c", "b"])
+
+    assert asyncio.run(scenario()) == [b"1", None, b"3", b"2"]
+
+
+@pytest.mark.parametrize("kind", BACKENDS)
+def test_concurrent_updates_are_not_lost(kind, tmp_path):
+    async def scenario():
+        async with workers(kind, tmp_path) as caches:
+            def append(i):
+                return lambda data: (data or b"") + b"%d," % i
+
+            await asyncio.gather(*[caches[i % len(caches)].update("list", append(i)) for i in range(8)])
+            return await caches[0].get("list")
+
+    assert sorted(asyncio.run(scenario()).split(b",")[:-1]) == [b"%d" % i for i in range(8)]
+
+
+def test_in_process_cache_evicts_least_recently_used():
+    async def scenario():
+        cache = InProcessCache(max_bytes=10)
+        await cache.set("a", b"1234")
+        await cache.set("b", b"1234")
+        await cache.get("a")
+        await cache.set("c", b"1234")
+        return [await cache.get(key) for key in "abc"]
+
+    assert asyncio.run(scenario()) == [b"1234", None, b"1234"]
+
+
+def test_sqlite_cache_purges_expired_rows(tmp_path):
+    async def scenario():
+        cache = SQLiteCache(str(tmp_path / "cache.db"))
+        cache.PURGE_INTERVAL = 0
+        await cache.set("old", b"x", ttl=0.01)
+        await asyncio.sleep(0.02)
+        await cache.set("new", b"y", ttl=60)
+        rows = cache._conn.execute("SELECT key FROM cache").fetchall()
+        await cache.close()
+        return rows
+
+    assert asyncio.run(scenario()) == [("new",)]
+
+
+def test_redis_cache_survives_cancelled_command():
+    async def scenario():
+        server = RedisStandIn()
+        await server.start()
+        server.delays[b"slow"] = 0.2
+        cache = RedisCache("127.0.0.1", server.port)
+        try:
+            await cache.set("slow", b"slow value")
+            await cache.set("fast", b"fast value")
+
+            pending = asyncio.ensure_future(cache.get("slow"))
+            await asyncio.sleep(0.05)
+            pending.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await pending
+
+            # The slow reply must not be taken for this one
+            return await cache.get("fast")
+        finally:
+            await cache.close()
+            await server.stop()
+
+    assert asyncio.run(scenario()) == b"fast value"
+
+
+@pytest.mark.parametrize("url", ["sqlite://cache.db", "sqlite://", "sqlite:///"])
+def test_sqlite_url_without_path_is_rejected(url):
+    with pytest.raises(ValueError):
+        create_cache_backend(url)
+
+
+def test_sqlite_cache_evicts_oldest_over_max_bytes(tmp_path):
+    async def scenario():
+        cache = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=10)
+        cache.PURGE_INTERVAL = 0
+        await cache.set("a", b"1234")
+        await cache.set("b", b"1234")
+        await cache.set("a", b"5678")
+        await cache.set_many({"c": b"1234"})
+        values = await cache.get_many(["a", "b", "c"])
+        await cache.close()
+        return values
+
+    # b is now the oldest write
+    assert asyncio.run(scenario()) == [b"5678", None, b"1234"]
+
+
+def test_redis_lock_taken_with_lost_reply_is_acquired():
+    async def scenario():
+        server = RedisStandIn()
+        await server.start()
+        server.lose_reply.add(b"lock:key")
+        cache, other = RedisCache("127.0.0.1", server.port), RedisCache("127.0.0.1", server.port)
+        try:
+            await cache.get("warm up")
+            # The SET NX lands but its reply is lost with the connection
+            token = await cache.acquire_lock("lock:key", 60)
+            held_elsewhere = await other.acquire_lock("lock:key", 60)
+            await cache.release_lock("lock:key", token)
+            return token, held_elsewhere, await other.acquire_lock("lock:key", 60)
+        finally:
+            await cache.close()
+            await other.close()
+            await server.stop()
+
+    token, held_elsewhere, after_release = asyncio.run(scenario())
+    assert token is not None
+    assert held_elsewhere is None
+    assert after_release is not None
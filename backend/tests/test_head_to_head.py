@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+import services.cache
+from conftest import RUY_LOPEZ, SICILIAN
+from services.chess_api import ChessComAPIService
+from services.game_index import GameIndex
+
+
+def test_head_to_head_scores_and_recent_games(client):
+    assert client.get("/api/games/alice/2020/1").status_code == 200
+
+    response = client.get("/api/users/alice/vs/BOB")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["total_games"], data["wins"], data["losses"], data["draws"]) == (3, 1, 1, 1)
+    assert [o["eco"] for o in data["openings"]] == [SICILIAN, RUY_LOPEZ]
+    # Recent games are loaded in full from the cache, most recent first
+    assert [g["end_time"] for g in data["recent_games"]] == [3, 2, 1]
+    assert data["recent_games"][0]["pgn"] == "1. e4 c5 3"
+    # Only the month fetch itself went to Chess.com
+    assert client.downloads == ["https://api.chess.com/pub/player/alice/games/2020/01"]
+
+
+def test_head_to_head_eco_filter(client):
+    client.get("/api/games/alice/2020/1")
+
+    data = client.get("/api/users/alice/vs/bob", params={"eco": SICILIAN}).json()
+
+    assert (data["total_games"], data["wins"], data["losses"]) == (2, 1, 1)
+    assert [g["end_time"] for g in data["recent_games"]] == [2, 1]
+
+
+def test_head_to_head_eco_slug_filter(client):
+    client.get("/api/games/alice/2020/1")
+
+    exact = client.get("/api/users/alice/vs/bob", params={"eco": "sicilian-defense-open"}).json()
+    family = client.get("/api/users/alice/vs/bob", params={"eco": "Sicilian-Defense"}).json()
+
+    assert exact["total_games"] == family["total_games"] == 2
+    assert [o["eco"] for o in family["openings"]] == [SICILIAN]
+
+
+@pytest.mark.parametrize("eco", ["", "  "])
+def test_head_to_head_blank_eco_is_no_filter(client, eco):
+    client.get("/api/games/alice/2020/1")
+
+    data = client.get("/api/users/alice/vs/bob", params={"eco": eco}).json()
+
+    assert data["total_games"] == 3
+
+
+@pytest.mark.parametrize("limit", [-1, 0, 101])
+def test_head_to_head_rejects_bad_limit(client, limit):
+    response = client.get("/api/users/alice/vs/bob", params={"limit": limit})
+
+    assert response.status_code == 422
+
+
+def test_head_to_head_sees_rows_from_other_workers(client):
+    client.get("/api/games/alice/2020/1")
+
+    # Another worker, or this one after a restart, with an empty local index
+    client.app.state.game_index = GameIndex()
+    data = client.get("/api/users/alice/vs/bob").json()
+
+    assert data["total_games"] == 3
+    assert len(data["recent_games"]) == 3
+
+
+class LaterClock:
+    """Stands in for the time module, running a fixed offset ahead"""
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def monotonic(self):
+        return time.monotonic() + self.offset
+
+    def time(self):
+        return time.time() + self.offset
+
+
+def test_shared_rows_outlive_the_archive_cache(client, monkeypatch):
+    client.get("/api/games/alice/2020/1")
+
+    # Past the raw archive's TTL, on a worker that has to rebuild its index
+    monkeypatch.setattr(services.cache, "time", LaterClock(ChessComAPIService.PAST_MONTH_TTL + 1))
+    client.app.state.game_index = GameIndex()
+    client.downloads.clear()
+    data = client.get("/api/users/alice/vs/bob").json()
+
+    assert data["total_games"] == 3
+    assert [g["end_time"] for g in data["recent_games"]] == [3, 2, 1]
+    assert client.downloads == []
@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import months
+from http_cache import IMMUTABLE_CACHE_CONTROL, SHORT_CACHE_CONTROL, etag_matches, make_etag
+from months import is_settled_month
+
+
+def freeze_now(monkeypatch, *args):
+    """Make months.is_settled_month see a fixed UTC time"""
+    frozen = datetime(*args, tzinfo=timezone.utc)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return frozen.astimezone(tz)
+
+    monkeypatch.setattr(months, "datetime", FrozenDatetime)
+
+
+def test_etag_is_a_quoted_content_hash():
+    etag = make_etag(b'{"games": []}')
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag(b'{"games": []}')
+    assert etag != make_etag(b'{"games": [1]}')
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ("*", True),
+    ('"old", W/"abc"', True),
+    ('"old","other"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches('"abc"', header) is matches
+
+
+@pytest.mark.parametrize("now, settled", [
+    ((2024, 7, 31, 23, 59), False),   # month not over
+    ((2024, 8, 2, 23, 59), False),    # within the grace period
+    ((2024, 8, 3, 0, 0), True),
+])
+def test_month_settles_after_grace_period(monkeypatch, now, settled):
+    freeze_now(monkeypatch, *now)
+
+    assert is_settled_month(2024, 7) is settled
+
+
+@pytest.mark.parametrize("now, settled", [
+    ((2025, 1, 2, 23, 59), False),
+    ((2025, 1, 3, 0, 0), True),
+])
+def test_december_settles_in_january(monkeypatch, now, settled):
+    freeze_now(monkeypatch, *now)
+
+    assert is_settled_month(2024, 12) is settled
+
+
+@pytest.mark.parametrize("month", [0, 13])
+def test_invalid_month_is_never_settled(month):
+    assert not is_settled_month(2000, month)
+
+
+def test_month_response_has_etag_and_answers_304(client):
+    first = client.get("/api/games/alice/2020/1")
+    etag = first.headers["etag"]
+
+    second = client.get("/api/games/alice/2020/1", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert etag == make_etag(first.content)
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert second.headers["cache-control"] == first.headers["cache-control"]
+
+
+def test_changed_month_is_sent_again(client):
+    response = client.get("/api/games/alice/2020/1", headers={"If-None-Match": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["total_games"] == 4
+
+
+@pytest.mark.parametrize("now, cache_control", [
+    ((2020, 1, 20), SHORT_CACHE_CONTROL),
+    ((2020, 2, 2), SHORT_CACHE_CONTROL),
+    ((2020, 2, 3), IMMUTABLE_CACHE_CONTROL),
+])
+def test_month_is_immutable_only_once_settled(client, monkeypatch, now, cache_control):
+    freeze_now(monkeypatch, *now)
+
+    response = client.get("/api/games/alice/2020/1")
+
+    assert response.headers["cache-control"] == cache_control
+
+
+def test_archive_list_is_cached_briefly(client):
+    first = client.get("/api/archives/alice")
+    second = client.get("/api/archives/alice", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.headers["cache-control"] == SHORT_CACHE_CONTROL
+    assert second.status_code == 304
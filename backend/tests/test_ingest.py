@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+import pickle
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from models import GameHistoryResponse
+from services.game_index import IndexRow
+from services.ingest import INLINE_THRESHOLD_BYTES, IngestPool, MonthBatch, default_workers, ingest_month
+
+PGN = '[Event "Live Chess"]\n\n1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 ' * 20
+
+
+def make_archive(count):
+    games = [
+        {
+            "url": f"https://www.chess.com/game/live/{i}",
+            "pgn": PGN,
+            "end_time": i,
+            "time_class": "blitz",
+            "white": {"username": "Alice", "rating": 1500, "result": "win"},
+            "black": {"username": f"opponent{i % 3}", "rating": 1500, "result": "resigned"},
+            "eco": "https://www.chess.com/openings/Ruy-Lopez-Opening",
+        }
+        for i in range(count)
+    ]
+    return json.dumps({"games": games}).encode()
+
+
+def test_index_rows_leave_games_out():
+    raw = make_archive(200)
+    batch = ingest_month(raw, "alice")
+
+    assert batch.total_games == 200
+    assert GameHistoryResponse.model_validate_json(batch.body).total_games == 200
+    assert batch.rows[0]._fields == ("url", "opponent", "eco", "result", "end_time")
+    # PGNs cross the process boundary once, inside the serialized games
+    assert len(pickle.dumps(batch)) < len(raw) * 1.2
+
+
+def test_pool_ingests_month_in_worker_process():
+    raw = make_archive(200)
+    assert len(raw) >= INLINE_THRESHOLD_BYTES
+
+    async def scenario():
+        pool = IngestPool(max_workers=1)
+        try:
+            batch = await pool.ingest_month(raw, "alice")
+            # Ran in a spawned process, not inline
+            assert pool._executor is not None
+            return batch
+        finally:
+            pool.close()
+
+    batch = asyncio.run(scenario())
+
+    assert isinstance(batch, MonthBatch)
+    assert isinstance(batch.rows[0], IndexRow)
+    assert batch == ingest_month(raw, "alice")
+
+
+@pytest.mark.parametrize("cpus, web_workers, expected", [
+    (8, None, 4),
+    (8, "4", 2),
+    (2, "8", 1),
+    (None, None, 1),
+])
+def test_default_workers_split_cpus_between_server_workers(monkeypatch, cpus, web_workers, expected):
+    monkeypatch.setattr(os, "cpu_count", lambda: cpus)
+    if web_workers is None:
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    else:
+        monkeypatch.setenv("WEB_CONCURRENCY", web_workers)
+
+    assert default_workers() == expected
+
+
+def _die():
+    os._exit(1)
+
+
+def _ok():
+    return "ok"
+
+
+def test_pool_recovers_after_worker_dies():
+    async def scenario():
+        pool = IngestPool(max_workers=1)
+        try:
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(_die)
+            return await pool.run(_ok)
+        finally:
+            pool.close()
+
+    assert asyncio.run(scenario()) == "ok"